@@ -2,7 +2,6 @@
 Bridge to legacy server.
 """
 
-from typing import NamedTuple
 import sys
 import os.path
 import logging
@@ -13,33 +12,25 @@ import itertools
 
 import aiohttp
 import playwright.async_api
-import apscheduler.triggers.interval  # type: ignore
-import apscheduler.schedulers.asyncio  # type: ignore
 
 from bridge.config import ConfigParseError, Config, try_load_config
 from bridge.cache import (
-    load_sort_events,
+    load_cache,
+    index_cache,
+    select_changed_raw_events,
+    sort_events,
     update_cache,
 )
-from bridge.event import Event
+from bridge.event import Event, fingerprint_raw_event
 from bridge.types import AppContext, PlayPersist
 from bridge.server import routes
 from bridge.client import push_event_to_clients
-from bridge.site.auth import try_load_do_auth
+from bridge.site.auth import i_ensure_auth, try_load_do_auth
 from bridge.site.event import i_fetch_extract_events
 
 logging.basicConfig(level=logging.INFO)
 
 
-class _PartialCacheEntry(NamedTuple):
-    """
-    Partial Cache Entry; for indexing by uid.
-    """
-
-    hash: str
-    rev_id: int
-
-
 async def fetch_push_events(ctx: AppContext, config: Config) -> None:
     """
     Run fetch_events then push_event for each one.
@@ -48,32 +39,64 @@ async def fetch_push_events(ctx: AppContext, config: Config) -> None:
     """
 
     async with ctx.play_lock:
-        await try_load_do_auth(
-            config.site.host,
-            config.authcache,
-            config.site.username,
-            config.site.password,
-            context=ctx.persist.context,
-            page=ctx.persist.page,
-        )
-        await ctx.persist.context.storage_state(path=config.authcache)
-        raw_events = await i_fetch_extract_events(
-            ctx.persist.context, ctx.persist.page, config.site.host
-        )
+        await i_ensure_auth(ctx)
 
-    events = list(map(Event.from_raw_event, raw_events))
+        raw_events = await i_fetch_extract_events(ctx)
+
+        if len(raw_events) == 0:
+            # possibly logged out; check again next time
+            ctx.auth.valid_until = 0.0
+
+    raw_fingerprints = list(map(fingerprint_raw_event, raw_events))
 
     async with ctx.cache_lock:
-        sort = load_sort_events(config.cache, events)
+        changed = select_changed_raw_events(ctx.entries, raw_events, raw_fingerprints)
+
+        # the common case; nothing to sort, push, or write
+        if len(changed) == 0:
+            return
+
+        events = [Event.from_raw_event(raw_events[i]) for i in changed]
+        fingerprints = [raw_fingerprints[i] for i in changed]
+
+        # hashing and cache file I/O block; keep them off the event
+        # loop so the API stays responsive. ctx.entries is guarded by cache_lock.
+        sort = await asyncio.to_thread(sort_events, ctx.entries, events, fingerprints)
         to_push = itertools.chain(sort.new, sort.updated)
 
         for idx in to_push:
             event = events[idx]
 
             logging.info("pushing event id=%s to clients", event.uid)
-            await push_event_to_clients(config, event)
+            await push_event_to_clients(ctx.session, config, event)
 
-        update_cache(config.cache, events, sort=sort)
+        await asyncio.to_thread(
+            update_cache, config.cache, ctx.entries, events, sort=sort
+        )
+
+
+async def poll(ctx: AppContext, config: Config) -> None:
+    """
+    Run fetch_push_events every `config.frequency` seconds.
+
+    The time spent in fetch_push_events counts towards the interval; so runs
+    do not drift. Each run is awaited before the next sleep; so runs never
+    overlap.
+    """
+    loop = asyncio.get_running_loop()
+    delay = float(config.frequency)
+
+    while True:
+        await asyncio.sleep(delay)
+        start = loop.time()
+
+        try:
+            await fetch_push_events(ctx, config)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logging.exception("fetch/push of events failed")
+
+        elapsed = loop.time() - start
+        delay = max(0.0, config.frequency - elapsed)
 
 
 async def run(config: Config) -> None:
@@ -83,7 +106,7 @@ async def run(config: Config) -> None:
     play = await playwright.async_api.async_playwright().start()
     browser = await play.firefox.launch(headless=True)
 
-    context, page = await try_load_do_auth(
+    context, page, refreshed = await try_load_do_auth(
         config.site.host,
         config.authcache,
         config.site.username,
@@ -91,18 +114,22 @@ async def run(config: Config) -> None:
         browser=browser,
     )
 
-    persist = PlayPersist(play, browser, context, page)
-    ctx = AppContext(config, persist)
-
-    scheduler = apscheduler.schedulers.asyncio.AsyncIOScheduler()
+    if refreshed:
+        await context.storage_state(path=config.authcache)
 
-    scheduler.add_job(
-        fetch_push_events,
-        apscheduler.triggers.interval.IntervalTrigger(seconds=config.frequency),
-        args=[ctx, config],
+    persist = PlayPersist(play, browser, context, page)
+    entries = index_cache(load_cache(config.cache))
+    # keep idle connections around across (at least) one default
+    # poll interval; so pushes reuse them rather than reconnecting
+    connector = aiohttp.TCPConnector(keepalive_timeout=75)
+    # do not carry cookies set by the legacy site over to later RSVPs (from
+    # other users); forwarding is stateless
+    session = aiohttp.ClientSession(
+        connector=connector, cookie_jar=aiohttp.DummyCookieJar()
     )
+    ctx = AppContext(config, persist, entries, session)
 
-    scheduler.start()
+    poller = asyncio.create_task(poll(ctx, config))
 
     app = aiohttp.web.Application()
     app.add_routes(routes)
@@ -115,7 +142,14 @@ async def run(config: Config) -> None:
     site = aiohttp.web.TCPSite(runner, config.api.host, config.api.port)
     await site.start()
 
-    await asyncio.Future()
+    try:
+        await asyncio.Future()
+    finally:
+        poller.cancel()
+        await runner.cleanup()
+        await session.close()
+        await browser.close()
+        await play.stop()
 
 
 def _error(msg: str) -> None:
@@ -2,77 +2,159 @@
 Event Cache Handling.
 """
 
-from typing import Sequence, NamedTuple
-import json
-import os.path
-import itertools
+from typing import Any, Iterable, Iterator, Mapping, Sequence, NamedTuple
+import os
+import base64
+import logging
 import dataclasses
 
+import orjson
+
 from bridge.event import Event, hash_event
+from bridge.site.types import RawEvent
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class CacheEntry:
     """
     An entry in the cache.
 
-    An (Event ID, Content Hash) pairing; where the content hash is a base64
-    hash of the object.
+    An (Event ID, Content Hash) pairing; where the content hash is the raw
+    digest of the object (see hash_event). It is base64 encoded on disk.
+
+    The fingerprint is a cheap fingerprint of the RawEvent the hash was derived
+    from (see fingerprint_raw_event); None for entries written before it was
+    tracked.
     """
 
     uid: str
-    hash: str
+    hash: bytes
     rev_id: int
+    fingerprint: int | None = None
 
 
-def load_cache(path: str) -> Sequence[CacheEntry]:
-    """
-    Load entries from a Cache file; returns an empty Sequence if the file does
-    not exist.
-    """
-    if not os.path.isfile(path):
-        return []
+# version 2 is newline-delimited; a `{"version": 2}` header line,
+# then one [uid, hash, rev_id, fingerprint] row per line. Rows are appended as
+# entries change, so a later row for a uid supersedes earlier ones.
+#
+# Unversioned caches are a single list of {uid, hash, rev_id} objects.
+_CACHE_VERSION = 2
 
-    with open(path, "r", encoding="utf-8") as file:
-        raw = json.load(file)
+# compact once the file is this many times larger than the live
+# entries alone would be
+_CACHE_COMPACT_RATIO = 2
 
-    assert isinstance(raw, list)
+_CACHE_HEADER = orjson.dumps({"version": _CACHE_VERSION}) + b"\n"
 
-    entries = []
 
-    for item in raw:
-        assert "uid" in item and isinstance(item["uid"], str)
-        assert "hash" in item and isinstance(item["hash"], str)
-        assert "rev_id" in item and isinstance(item["rev_id"], int)
+def _encode_row(entry: CacheEntry) -> bytes:
+    row = (
+        entry.uid,
+        base64.b64encode(entry.hash).decode("ascii"),
+        entry.rev_id,
+        entry.fingerprint,
+    )
 
-        uid: str = item["uid"]
-        hash: str = item["hash"]
-        rev_id: int = item["rev_id"]
+    return orjson.dumps(row) + b"\n"
 
-        entry = CacheEntry(uid, hash, rev_id)
-        entries.append(entry)
 
-    return entries
+def _decode_row(row: list[Any]) -> CacheEntry:
+    uid, digest, rev_id, fingerprint = row
+    return CacheEntry(uid, base64.b64decode(digest), rev_id, fingerprint)
 
 
-def write_cache(path: str, entries: Sequence[CacheEntry]) -> None:
+def load_cache(path: str) -> Iterator[CacheEntry]:
+    """
+    Stream entries from a Cache file; yields nothing if the file does not
+    exist.
+
+    Superseded entries are included, in file order; see index_cache.
+    """
+    if not os.path.isfile(path):
+        return
+
+    with open(path, "rb") as file:
+        raw = orjson.loads(file.readline())
+
+        # the cache is only ever written by this module; trust its
+        # schema past the version check rather than validating every entry
+        if isinstance(raw, list):
+            for item in raw:
+                yield CacheEntry(
+                    item["uid"],
+                    base64.b64decode(item["hash"]),
+                    item["rev_id"],
+                )
+            return
+
+        assert isinstance(raw, dict) and raw.get("version") == _CACHE_VERSION
+
+        for line in file:
+            try:
+                row = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # a row torn by a crash mid-append; the entry is treated as
+                # new (or updated) on the next sort, and the next write
+                # compacts the row away (see _should_compact)
+                logging.warning("skipping malformed row in cache %s", path)
+                continue
+
+            yield _decode_row(row)
+
+
+def write_cache(path: str, entries: Iterable[CacheEntry]) -> None:
     """
     Destructively overwrite the Cache file with new entries.
+
+    The entries are written to a temporary file which then replaces the Cache
+    file; so a crash mid-write cannot leave a truncated Cache behind.
     """
 
-    se = list(map(dataclasses.asdict, entries))
+    path_tmp = f"{path}.tmp"
+
+    with open(path_tmp, "wb") as file:
+        file.write(_CACHE_HEADER)
+        file.writelines(map(_encode_row, entries))
 
-    with open(path, "w", encoding="utf-8") as file:
-        json.dump(se, file)
+    os.replace(path_tmp, path)
 
 
-class _PartialCacheEntry(NamedTuple):
+def append_cache(path: str, entries: Iterable[CacheEntry]) -> None:
     """
-    Partial Cache Entry; for indexing by uid.
+    Append (superseding) entries to an existing, current version, Cache file;
+    which must end on a complete row (see _should_compact).
     """
 
-    hash: str
-    rev_id: int
+    with open(path, "ab") as file:
+        file.writelines(map(_encode_row, entries))
+
+
+def _should_compact(
+    path: str, entries: Mapping[str, CacheEntry], changed: Sequence[CacheEntry]
+) -> bool:
+    """
+    Whether the Cache file should be rewritten rather than appended to.
+    """
+    if not os.path.isfile(path):
+        return True
+
+    with open(path, "rb") as file:
+        # never append to a cache in an older format
+        if file.readline() != _CACHE_HEADER:
+            return True
+
+        # nor to a row torn by a crash mid-append; rewriting drops it, rather
+        # than leaving it to be skipped on every load
+        file.seek(-1, os.SEEK_END)
+        if file.read(1) != b"\n":
+            return True
+
+    # rows are roughly equally sized; estimate the size of the live
+    # entries from a row about to be appended
+    row_size = len(_encode_row(changed[0]))
+    size = os.path.getsize(path) + len(changed) * row_size
+
+    return size > _CACHE_COMPACT_RATIO * len(entries) * row_size
 
 
 class EventSort(NamedTuple):
@@ -83,79 +165,144 @@ class EventSort(NamedTuple):
     new: Sequence[int]
     updated: Sequence[int]
     unchanged: Sequence[int]
-    hashes: Sequence[str]
-    entries: Sequence[CacheEntry]
+    hashes: Sequence[bytes]
+    fingerprints: Sequence[int | None]
 
 
-def load_sort_events(path: str, events: Sequence[Event]) -> EventSort:
+def index_cache(entries: Iterable[CacheEntry]) -> dict[str, CacheEntry]:
     """
-    Load Entries and Classify Events.
+    Index cache entries by uid.
+
+    Later entries win. Cache files written by older versions may hold stale
+    duplicates of an entry ahead of its current one; those are dropped here and
+    on the next write.
     """
+    return {entry.uid: entry for entry in entries}
 
-    entries = load_cache(path)
-    hashes = list(map(hash_event, events))
 
-    def entry_to_uid_to_partial(entry: CacheEntry) -> tuple[str, _PartialCacheEntry]:
-        return (entry.uid, _PartialCacheEntry(entry.hash, entry.rev_id))
+def select_changed_raw_events(
+    entries: Mapping[str, CacheEntry],
+    raw_events: Sequence[RawEvent],
+    fingerprints: Sequence[int],
+) -> list[int]:
+    """
+    Select the indices of RawEvents that may differ from their cache entry.
 
-    uid_to_partial: dict[str, _PartialCacheEntry] = dict(
-        map(
-            entry_to_uid_to_partial,
-            entries,
-        )
-    )
+    A RawEvent whose fingerprint matches its cache entry is identical to the
+    one the entry was derived from; so it is unchanged and need not even be
+    converted to an Event.
+    """
+
+    changed = []
+
+    for i, raw_event in enumerate(raw_events):
+        cached = entries.get(raw_event["_id"])
+
+        if cached is not None and cached.fingerprint == fingerprints[i]:
+            continue
+
+        changed.append(i)
+
+    return changed
+
+
+def sort_events(
+    entries: Mapping[str, CacheEntry],
+    events: Sequence[Event],
+    fingerprints: Sequence[int] | None = None,
+) -> EventSort:
+    """
+    Classify Events against the (indexed) cache entries.
+
+    If fingerprints (see fingerprint_raw_event) are given, the hash of an Event
+    whose fingerprint matches its cache entry is reused rather than recomputed.
+    """
 
     new = []
     updated = []
     unchanged = []
+    hashes = []
 
     for i, event in enumerate(events):
-        if event.uid not in uid_to_partial:
+        cached = entries.get(event.uid)
+
+        if cached is None:
             new.append(i)
+            hashes.append(hash_event(event))
+            continue
+
+        # identical RawEvent; reuse the cached hash instead of
+        # converting and re-hashing the Event
+        if fingerprints is not None and cached.fingerprint == fingerprints[i]:
+            unchanged.append(i)
+            hashes.append(cached.hash)
             continue
 
-        ahash = hashes[i]
-        entry = uid_to_partial[event.uid]
-        if entry.hash != ahash:
+        ahash = hash_event(event)
+        hashes.append(ahash)
+
+        if cached.hash != ahash:
             updated.append(i)
             continue
 
         unchanged.append(i)
 
-    return EventSort(new, updated, unchanged, hashes, entries)
+    if fingerprints is None:
+        return EventSort(new, updated, unchanged, hashes, [None] * len(events))
+
+    return EventSort(new, updated, unchanged, hashes, fingerprints)
 
 
 def update_cache(
-    path: str, events: Sequence[Event], sort: EventSort | None = None
+    path: str,
+    entries: dict[str, CacheEntry],
+    events: Sequence[Event],
+    sort: EventSort | None = None,
 ) -> None:
     """
-    Overwrite the existing cache with new Event(s).
+    Update the (indexed) cache entries in place with new Event(s), then
+    append the new and updated entries to the existing cache.
+
+    The existing cache is compacted (rewritten from the indexed entries) rather
+    than appended to once superseded entries make up most of it. It is left
+    untouched if there are no new or updated Events; refreshed fingerprints
+    alone are not worth a write, and are only persisted on compaction.
     """
     if sort is None:
-        sort = load_sort_events(path, events)
+        sort = sort_events(entries, events)
 
-    new_and_updated_uids = map(
-        lambda i: events[i].uid, itertools.chain(sort.new, sort.updated)
-    )
-    uid_to_entry: dict[str, CacheEntry] = dict(
-        map(lambda entry: (entry.uid, entry), sort.entries)
-    )
+    # refresh the fingerprint of unchanged events; the RawEvent may
+    # have changed in ways that do not affect the Event
+    for i in sort.unchanged:
+        old = entries[events[i].uid]
+        fingerprint = sort.fingerprints[i]
 
-    carry_over = filter(
-        lambda entry: entry.uid not in new_and_updated_uids, sort.entries
-    )
+        if fingerprint is None or fingerprint == old.fingerprint:
+            continue
 
-    next_cache: list[CacheEntry] = []
-    next_cache.extend(carry_over)
+        entries[old.uid] = CacheEntry(old.uid, old.hash, old.rev_id, fingerprint)
+
+    changed = [
+        CacheEntry(events[i].uid, sort.hashes[i], 0, sort.fingerprints[i])
+        for i in sort.new
+    ] + [
+        CacheEntry(
+            events[i].uid,
+            sort.hashes[i],
+            entries[events[i].uid].rev_id + 1,
+            sort.fingerprints[i],
+        )
+        for i in sort.updated
+    ]
 
-    for i in sort.new:
-        entry = CacheEntry(events[i].uid, sort.hashes[i], 0)
-        next_cache.append(entry)
+    if len(changed) == 0:
+        return
 
-    for i in sort.updated:
-        old = uid_to_entry[events[i].uid]
-        entry = CacheEntry(events[i].uid, sort.hashes[i], old.rev_id + 1)
+    for entry in changed:
+        entries[entry.uid] = entry
 
-        next_cache.append(entry)
+    if _should_compact(path, entries, changed):
+        write_cache(path, entries.values())
+        return
 
-    write_cache(path, next_cache)
+    append_cache(path, changed)
@@ -2,15 +2,19 @@
 Client Handling Utilities.
 """
 
-from typing import Any
-import aiohttp
+import asyncio
 import logging
 
+import aiohttp
+import orjson
+
 from bridge.event import Event
 from bridge.config import Config
 
 
 _EXPECTED_PUSH_RESPONSES = frozenset([200, 201])
+JSON_HEADERS = {"Content-Type": "application/json"}
+_PUSH_TIMEOUT = aiohttp.ClientTimeout(total=10)
 
 
 async def _push_event_to_client(
@@ -19,20 +23,24 @@ async def _push_event_to_client(
     host: str,
     port: int,
     uid: str,
-    event: dict[Any, Any],
+    body: bytes,
 ) -> None:
     """
-    Push an Event to a Client.
+    Push a serialized Event to a Client.
     """
     url = f"http://{host}:{port}/event"
-    headers = {"Content-Type": "application/json"}
 
     try:
-        async with session.post(url, json=event, headers=headers) as response:
+        async with session.post(
+            url, data=body, headers=JSON_HEADERS, timeout=_PUSH_TIMEOUT
+        ) as response:
             hoisted = response
     except aiohttp.ClientConnectionError:
         logging.error("could not connect to client %s", name)
         return
+    except asyncio.TimeoutError:
+        logging.error("timed out pushing to client %s", name)
+        return
 
     if hoisted.status not in _EXPECTED_PUSH_RESPONSES:
         logging.error(
@@ -48,22 +56,38 @@ async def _push_event_to_client(
         logging.info("client %s updated event id=%s", name, uid)
 
 
-async def push_event_to_clients(config: Config, event: Event) -> None:
+async def push_event_to_clients(
+    session: aiohttp.ClientSession, config: Config, event: Event
+) -> None:
     """
-    Push an Event to all Clients.
+    Push an Event to all Clients concurrently.
+
+    The Event is serialized once and the same body is sent to every Client. A
+    failing Client does not affect the pushes to the others.
     """
 
-    se = event.to_dict()
-    session = aiohttp.ClientSession()
-
-    for client in config.clients:
-        await _push_event_to_client(
-            session,
-            client.name,
-            client.host,
-            client.port,
-            event.uid,
-            se,
-        )
+    se_bytes = orjson.dumps(event.to_dict())
+
+    results = await asyncio.gather(
+        *(
+            _push_event_to_client(
+                session,
+                client.name,
+                client.host,
+                client.port,
+                event.uid,
+                se_bytes,
+            )
+            for client in config.clients
+        ),
+        return_exceptions=True,
+    )
 
-    await session.close()
+    for client, result in zip(config.clients, results):
+        if isinstance(result, Exception):
+            logging.error(
+                "failed to push event id=%s to client %s",
+                event.uid,
+                client.name,
+                exc_info=result,
+            )
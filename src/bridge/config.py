@@ -4,9 +4,10 @@ Configuration loading.
 
 from typing import Any, cast
 import os.path
-import tomllib
 import dataclasses
 
+_DEFAULT_SITE_CONCURRENCY = 8
+
 
 @dataclasses.dataclass(frozen=True)
 class ConfigParseError(Exception):
@@ -17,7 +18,7 @@ class ConfigParseError(Exception):
     reason: str
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class ClientSection:
     """
     A `client.*` section.
@@ -28,7 +29,7 @@ class ClientSection:
     port: int
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class SiteSection:
     """
     A `site` section.
@@ -37,9 +38,10 @@ class SiteSection:
     host: str
     username: str
     password: str
+    concurrency: int
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class ApiSection:
     """
     A `api` section.
@@ -49,7 +51,7 @@ class ApiSection:
     port: int
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class Config:
     """
     Application Configuration.
@@ -85,7 +87,15 @@ def _load_site_section(table: dict[str, Any]) -> SiteSection:
     username: str = table["username"]
     password: str = table["password"]
 
-    return SiteSection(host, username, password)
+    concurrency: int = _DEFAULT_SITE_CONCURRENCY
+    if "concurrency" in table:
+        _require_attribute(table, "concurrency", int, prefix="site")
+        concurrency = table["concurrency"]
+
+    if concurrency < 1:
+        raise ConfigParseError("site.concurrency must be at least 1")
+
+    return SiteSection(host, username, password, concurrency)
 
 
 def _load_api_section(table: dict[str, Any]) -> ApiSection:
@@ -114,6 +124,9 @@ def try_load_config(path: str) -> Config:
 
     Raises a ConfigParseError if the Config could not be loaded.
     """
+    # deferred; tomllib is comparatively slow to import and is only
+    # needed once, here
+    import tomllib  # pylint: disable=import-outside-toplevel
 
     with open(path, "rb") as file:
         try:
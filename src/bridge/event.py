@@ -5,12 +5,12 @@ Event Handling.
 from __future__ import annotations
 from typing import Any, cast
 import enum
-import json
-import base64
-import hashlib
 import datetime
 import dataclasses
 
+import orjson
+import xxhash
+
 from bridge.site.types import RawEvent
 
 
@@ -18,8 +18,9 @@ def _get_nonempty_string(src: dict[str, Any], name: str) -> str | None:
     """
     Get a string from the dictionary; check that it is non-empty.
     """
-    if (name in src) and (isinstance(src[name], str)) and (len(src[name]) != 0):
-        return src[name]
+    value = src.get(name)
+    if isinstance(value, str) and (len(value) != 0):
+        return value
 
     return None
 
@@ -35,7 +36,7 @@ class ParticipationStatus(enum.Enum):
     DECLINED = "DECLINED"
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class Attendee:
     """
     An Event Attendee.
@@ -77,8 +78,18 @@ class Attendee:
 
         return Attendee(aid, uid, furname, username, status)
 
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to a `dict` for serialization."""
+        return {
+            "aid": self.aid,
+            "uid": self.uid,
+            "furname": self.furname,
+            "username": self.username,
+            "status": self.status.value,
+        }
+
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class Organizer:
     """
     An Event Organizer.
@@ -106,6 +117,14 @@ class Organizer:
 
         return Organizer(uid, furname, username)
 
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to a `dict` for serialization."""
+        return {
+            "uid": self.uid,
+            "furname": self.furname,
+            "username": self.username,
+        }
+
 
 @enum.unique
 class EventStatus(enum.Enum):
@@ -119,7 +138,7 @@ class EventStatus(enum.Enum):
 
 
 # pylint: disable=too-many-instance-attributes
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class Event:
     """
     An translated subset of a RawEvent.
@@ -202,36 +221,43 @@ class Event:
 
     def to_dict(self) -> dict[str, Any]:
         """Convert to a `dict` for serialization."""
-        base = dataclasses.asdict(self)
-
-        base["status"] = base["status"].value
-
-        def remap(attendee: dict[str, Any]) -> dict[str, Any]:
-            attendee["status"] = attendee["status"].value
-            return attendee
-
-        base["attendees"] = list(map(remap, base["attendees"]))
-
-        base["dtstart"] = base["dtstart"].isoformat()
-        base["dtend"] = base["dtend"].isoformat()
+        return {
+            "uid": self.uid,
+            "status": self.status.value,
+            "allday": self.allday,
+            "organizer": self.organizer.to_dict(),
+            "attendees": [attendee.to_dict() for attendee in self.attendees],
+            "summary": self.summary,
+            "location": self.location,
+            "description": self.description,
+            "dtstart": self.dtstart.isoformat(),
+            "dtend": self.dtend.isoformat(),
+        }
+
+
+def fingerprint_raw_event(raw_event: RawEvent) -> int:
+    """
+    Cheap fingerprint of a RawEvent.
 
-        return base
+    Identical RawEvents produce the same fingerprint; so a matching fingerprint
+    lets us reuse a previously computed hash_event result without converting
+    and re-hashing the Event.
+    """
+    return xxhash.xxh3_64_intdigest(orjson.dumps(raw_event))
 
 
-def hash_event(event: Event) -> str:
+def hash_event(event: Event) -> bytes:
     """
     Hacky workaround to avoid implementing a __hash__ method for an Event.
 
-    Assumption: equivalent Events will produce the same json.dumps output; so
-    we hash the json.dumps output to get a unique hash.
-    """
-    se_dict = event.to_dict()
-    se_str = json.dumps(se_dict)
-
-    se_bytes = se_str.encode("utf-8")
-    hasher = hashlib.blake2b(se_bytes)
+    Assumption: equivalent Events will produce the same orjson output; so we
+    hash the serialized output to get a unique hash. The hash is only used for
+    change detection, so a non-cryptographic hash is sufficient.
 
-    dig = hasher.digest()
-    enc = base64.b64encode(dig)
+    orjson serializes the (frozen) dataclasses, enums, and datetimes directly;
+    so there is no need to go through to_dict. Dataclass fields are serialized
+    in declaration order, which keeps the output stable.
+    """
+    se_bytes = orjson.dumps(event)
 
-    return enc.decode("utf-8")
+    return xxhash.xxh3_128_digest(se_bytes)
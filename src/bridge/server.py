@@ -3,18 +3,18 @@ Server Handlers.
 """
 
 from typing import TypeAlias, TypedDict, Literal, cast
-import base64
 import asyncio
 import logging
 
 import aiohttp
 import aiohttp.web
+import orjson
 
-from bridge.event import Event, hash_event
+from bridge.event import Event, fingerprint_raw_event
 from bridge.types import AppContext
-from bridge.cache import load_cache, load_sort_events, update_cache
-from bridge.client import push_event_to_clients
-from bridge.site.auth import try_load_do_auth
+from bridge.cache import sort_events, update_cache
+from bridge.client import JSON_HEADERS, push_event_to_clients
+from bridge.site.auth import i_ensure_auth
 from bridge.site.event import i_extract_event
 
 routes = aiohttp.web.RouteTableDef()
@@ -49,11 +49,8 @@ class LegacyRsvpRequest(TypedDict):
     telegramName: str
 
 
-_REQUEST_STATUS_TO_PARTSTAT: dict[RsvpRequestStatus, LegacyPartstat] = {
-    0: "ACCEPTED",
-    1: "TENTATIVE",
-    2: "DECLINED",
-}
+# Indexed by RsvpRequestStatus.
+_PARTSTAT_BY_STATUS: tuple[LegacyPartstat, ...] = ("ACCEPTED", "TENTATIVE", "DECLINED")
 
 
 async def _update_clients(ctx: AppContext, eid: str) -> None:
@@ -63,36 +60,37 @@ async def _update_clients(ctx: AppContext, eid: str) -> None:
     logging.info("bgupd event id=%s | authentication", eid)
 
     async with ctx.play_lock:
-        await try_load_do_auth(
-            ctx.config.site.host,
-            ctx.config.authcache,
-            ctx.config.site.username,
-            ctx.config.site.password,
-            context=ctx.persist.context,
-            page=ctx.persist.page,
-        )
-        await ctx.persist.context.storage_state(path=ctx.config.authcache)
+        await i_ensure_auth(ctx)
 
         logging.info("bgupd event id=%s | extraction", eid)
-        raw_event_r = await i_extract_event(
-            ctx.persist.context, ctx.config.site.host, eid
+        raw_event = await i_extract_event(
+            ctx.persist.context, ctx.config.site.host, eid, ctx.raw_events
         )
 
-    if raw_event_r is None:
+        if raw_event is None:
+            # possibly logged out; check again next time
+            ctx.auth.valid_until = 0.0
+
+    if raw_event is None:
         logging.info("bgupd event id=%s | extraction failed!", eid)
         return
 
-    event = Event.from_raw_event(raw_event_r["data"])
+    event = Event.from_raw_event(raw_event)
+    fingerprint = fingerprint_raw_event(raw_event)
 
+    # hashing and cache file I/O block; keep them off the event loop.
+    # ctx.entries is guarded by cache_lock.
     async with ctx.cache_lock:
-        sort = load_sort_events(ctx.config.cache, [event])
+        sort = await asyncio.to_thread(sort_events, ctx.entries, [event], [fingerprint])
         duplicate = len(sort.updated) == 0
 
-        update_cache(ctx.config.cache, [event])
+        await asyncio.to_thread(
+            update_cache, ctx.config.cache, ctx.entries, [event], sort=sort
+        )
 
     if not duplicate:
         logging.info("bgupd event id=%s | pushing", eid)
-        await push_event_to_clients(ctx.config, event)
+        await push_event_to_clients(ctx.session, ctx.config, event)
 
 
 @routes.post("/event/{id}/rsvp")
@@ -102,29 +100,36 @@ async def post_event_rsvp(request: aiohttp.web.Request):
     """
     ctx = cast(AppContext, request.app["ctx"])
 
-    body = await request.json()
+    body = orjson.loads(await request.read())
     raw = cast(RawRsvpRequest, body)
 
+    # bool is an int; do not accept `true`/`false` as statuses 1/0
+    status = raw["status"]
+    if isinstance(status, bool) or not isinstance(status, int):
+        return aiohttp.web.Response(status=400)
+
+    if not 0 <= status < len(_PARTSTAT_BY_STATUS):
+        return aiohttp.web.Response(status=400)
+
     eid = request.match_info["id"]
 
     url = f"https://{ctx.config.site.host}/events/partstat/{eid}"
     legacy: LegacyRsvpRequest = {
-        "partstat": _REQUEST_STATUS_TO_PARTSTAT[raw["status"]],
+        "partstat": _PARTSTAT_BY_STATUS[status],
         "telegramId": raw["telegram_id"],
         "telegramUsername": raw["telegram_username"],
         "telegramName": raw["telegram_name"],
     }
 
-    session = aiohttp.ClientSession()
+    se_bytes = orjson.dumps(legacy)
 
     ok = False
-    async with session.post(url, json=legacy) as response:
+    async with ctx.session.post(url, data=se_bytes, headers=JSON_HEADERS) as response:
         ok = response.ok
 
     # XXX(mwp): create a background task to fetch the updated event and push it
     # to clients
     asyncio.create_task(_update_clients(ctx, eid))
-    await session.close()
 
     if ok:
         return aiohttp.web.Response(status=200)
@@ -2,12 +2,19 @@
 Authorization Functionality.
 """
 
+import time
 import os.path
 import playwright.async_api
 
+from bridge.types import AppContext
 
 _LOGIN_BUTTON_CSS_PATH = "html body main form div.flex-container.flex-justifyContent-center input.button.button-primary"
 
+# the site's session lifetime is unknown; keep this short. A stale
+# assumption costs at most one failed fetch, after which the check is forced
+# again
+_AUTH_TTL = 300.0
+
 
 async def i_login(
     page: playwright.async_api.Page, host: str, username: str, password: str
@@ -27,10 +34,17 @@ async def check_auth(page: playwright.async_api.Page, host: str) -> bool:
     """
     Use the Page to check whether or not the Context a Page belongs to is
     authorized.
+
+    Issues a plain request (sharing the Context's cookies) rather than
+    navigating the Page; an unauthorized Context is redirected to the login
+    page.
     """
 
-    await page.goto(f"https://{host}/events")
-    return not page.url.endswith("/login")
+    response = await page.context.request.get(f"https://{host}/events")
+    authorized = not response.url.endswith("/login")
+
+    await response.dispose()
+    return authorized
 
 
 async def try_load_do_auth(
@@ -41,12 +55,15 @@ async def try_load_do_auth(
     browser: playwright.async_api.Browser | None = None,
     context: playwright.async_api.BrowserContext | None = None,
     page: playwright.async_api.Page | None = None,
-) -> tuple[playwright.async_api.BrowserContext, playwright.async_api.Page]:
+) -> tuple[playwright.async_api.BrowserContext, playwright.async_api.Page, bool]:
     """
     Try to load authorization credentials from disk and create a new
     (BrowserContext, Page) with them.
 
     Create a new (BrowserContext, Page) if the credentials don't work.
+
+    The trailing bool reports whether a login was performed; i.e. whether the
+    credentials on disk are stale and should be rewritten.
     """
     fresh = not os.path.isfile(cache)
 
@@ -64,11 +81,37 @@ async def try_load_do_auth(
 
     if fresh:
         await i_login(page, host, username, password)
-        return (context, page)
+        return (context, page, True)
 
     works = await check_auth(page, host)
     if works:
-        return (context, page)
+        return (context, page, False)
 
     await i_login(page, host, username, password)
-    return (context, page)
+    return (context, page, True)
+
+
+async def i_ensure_auth(ctx: AppContext) -> None:
+    """
+    Ensure the persistent (BrowserContext, Page) is authorized; must be called
+    with play_lock held.
+
+    The check is skipped while a previous one is recent (see AuthState); the
+    credentials on disk are rewritten after a login.
+    """
+    if time.monotonic() < ctx.auth.valid_until:
+        return
+
+    _, _, refreshed = await try_load_do_auth(
+        ctx.config.site.host,
+        ctx.config.authcache,
+        ctx.config.site.username,
+        ctx.config.site.password,
+        context=ctx.persist.context,
+        page=ctx.persist.page,
+    )
+
+    if refreshed:
+        await ctx.persist.context.storage_state(path=ctx.config.authcache)
+
+    ctx.auth.valid_until = time.monotonic() + _AUTH_TTL
@@ -3,16 +3,24 @@ Event Scraping/Fetching Utilities.
 """
 
 from typing import Sequence, cast
-import re
+import asyncio
 import logging
 
+import orjson
 import playwright.async_api
 
+from bridge.types import AppContext, TaggedRawEvent
 from bridge.site.types import GetEventResponse, RawEvent
 
-_ONCLICK_PATTERN = re.compile(
-    r"window\.location\.assign\('\/events\/id\/([a-zA-Z0-9]+)'\);",
-)
+# cards navigate with `window.location.assign('/events/id/<uid>');`
+_ONCLICK_PREFIX = "window.location.assign('/events/id/"
+_ONCLICK_SUFFIX = "');"
+
+# uids are 24 character ObjectIds; leave some slack, but do not
+# query arbitrarily long ids
+_UID_MAX_LENGTH = 32
+
+_JSON_HEADERS = {"Accept": "application/json"}
 
 
 async def i_extract_event_ids(page: playwright.async_api.Page, host: str) -> list[str]:
@@ -22,72 +30,129 @@ async def i_extract_event_ids(page: playwright.async_api.Page, host: str) -> lis
 
     await page.goto(f"https://{host}/events")
 
-    cdiv = page.locator("#content")
-    cards = cdiv.locator(".cursor_pointer")
+    cards = page.locator("#content .cursor_pointer[onclick]")
 
-    uids = []
-    ncards = await cards.count()
+    # read every onclick in one round trip to the driver, rather
+    # than one (or two) per card
+    attrs: list[str] = await cards.evaluate_all(
+        "cards => cards.map(card => card.getAttribute('onclick'))"
+    )
 
-    for i in range(ncards):
-        card = cards.nth(i)
+    uids = []
 
-        attr = await card.get_attribute("onclick")
-        if attr is None:
+    for attr in attrs:
+        if not attr.startswith(_ONCLICK_PREFIX):
             continue
 
-        match = _ONCLICK_PATTERN.match(attr)
-        if match is None:
+        uid, found, _ = attr[len(_ONCLICK_PREFIX) :].partition(_ONCLICK_SUFFIX)
+        if not (
+            found and len(uid) <= _UID_MAX_LENGTH and uid.isascii() and uid.isalnum()
+        ):
             continue
 
-        uid = match[1]
         uids.append(uid)
 
     return uids
 
 
 async def i_extract_event(
-    context: playwright.async_api.BrowserContext, host: str, uid: str
-) -> GetEventResponse | None:
+    context: playwright.async_api.BrowserContext,
+    host: str,
+    uid: str,
+    raw_events: dict[str, TaggedRawEvent] | None = None,
+) -> RawEvent | None:
     """
-    Extract Event information.
+    Extract Event information; the `.data` of the GetEventResponse.
+
+    If `raw_events` is given, the last seen RawEvent is revalidated
+    (If-None-Match) rather than fetched again; `raw_events` is updated with
+    the result.
     """
 
+    cached = raw_events.get(uid) if raw_events is not None else None
+
+    headers = _JSON_HEADERS
+    if cached is not None:
+        headers = {**_JSON_HEADERS, "If-None-Match": cached.etag}
+
     response = await context.request.get(
-        f"https://{host}/events/id/{uid}", headers={"Accept": "application/json"}
+        f"https://{host}/events/id/{uid}", headers=headers
     )
-    if not response.ok:
-        return None
 
-    body = await response.json()
-    typed = cast(GetEventResponse, body)
+    # the Context lives as long as the app; release the body held by the driver
+    try:
+        if cached is not None and response.status == 304:
+            return cached.raw_event
 
-    return typed
+        # an unauthorized Context is redirected to the (HTML) login page
+        if not response.ok or response.url.endswith("/login"):
+            return None
 
+        try:
+            body = orjson.loads(await response.body())
+        except orjson.JSONDecodeError:
+            return None
+    finally:
+        await response.dispose()
 
-async def i_fetch_extract_events(
-    context: playwright.async_api.BrowserContext,
-    page: playwright.async_api.Page,
-    host: str,
-) -> Sequence[RawEvent]:
+    raw_event = cast(GetEventResponse, body)["data"]
+
+    if raw_events is not None:
+        etag = response.headers.get("etag")
+
+        if etag is not None:
+            raw_events[uid] = TaggedRawEvent(etag, raw_event)
+        else:
+            raw_events.pop(uid, None)
+
+    return raw_event
+
+
+async def i_fetch_extract_events(ctx: AppContext) -> Sequence[RawEvent]:
     """
-    Fetch RawEvents from remote host.
+    Fetch RawEvents from remote host, using the persistent (BrowserContext,
+    Page); must be called with play_lock held.
 
-    Extract Event identifiers, then query the details of each event identifier.
+    Extract Event identifiers, then query the details of each event identifier;
+    at most `site.concurrency` queries are in flight at once. Events whose
+    query fails are skipped.
     """
+    context = ctx.persist.context
+    host = ctx.config.site.host
+
     logging.info("querying %s for event ids", host)
 
-    raw_uids = await i_extract_event_ids(page, host)
-    uids = frozenset(raw_uids)
+    raw_uids = await i_extract_event_ids(ctx.persist.page, host)
+    uids = list(dict.fromkeys(raw_uids))
+
+    semaphore = asyncio.Semaphore(ctx.config.site.concurrency)
+
+    async def extract(uid: str) -> RawEvent | None:
+        async with semaphore:
+            logging.debug("querying details of event id=%s", uid)
+            return await i_extract_event(context, host, uid, ctx.raw_events)
+
+    # one failing query should not lose the other events
+    responses = await asyncio.gather(*map(extract, uids), return_exceptions=True)
+
+    # forget RawEvents of events no longer listed
+    for uid in ctx.raw_events.keys() - set(uids):
+        del ctx.raw_events[uid]
 
     events = []
-    for uid in uids:
-        logging.info("querying details of event id=%s", uid)
-        get_event_resp = await i_extract_event(context, host, uid)
+    for uid, raw_event in zip(uids, responses):
+        if isinstance(raw_event, BaseException):
+            logging.warning(
+                "encountered error querying details of event id=%s",
+                uid,
+                exc_info=raw_event,
+            )
+            continue
 
-        if get_event_resp is None:
+        if raw_event is None:
             logging.warning("encountered error querying details of event id=%s", uid)
             continue
 
-        events.append(get_event_resp["data"])
+        events.append(raw_event)
 
     return events
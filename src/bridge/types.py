@@ -2,15 +2,19 @@
 Module-Neutral Types.
 """
 
+from typing import NamedTuple
 import asyncio
 import dataclasses
 
+import aiohttp
 import playwright.async_api
 
 from bridge.config import Config
+from bridge.cache import CacheEntry
+from bridge.site.types import RawEvent
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class PlayPersist:
     """
     Persistent `playwright` status.
@@ -22,13 +26,47 @@ class PlayPersist:
     page: playwright.async_api.Page
 
 
-@dataclasses.dataclass(frozen=True)
+class TaggedRawEvent(NamedTuple):
+    """
+    A RawEvent and the ETag of the response it was served in.
+    """
+
+    etag: str
+    raw_event: RawEvent
+
+
+@dataclasses.dataclass(slots=True)
+class AuthState:
+    """
+    Mutable authorization status; guarded by play_lock.
+
+    valid_until: `time.monotonic()` deadline before which the persistent
+                 Context is assumed to still be authorized.
+    """
+
+    valid_until: float = 0.0
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclasses.dataclass(frozen=True, slots=True)
 class AppContext:
     """
     App Synchronization Context.
+
+    entries:    In-memory cache entries indexed by uid; loaded once on startup,
+                guarded by cache_lock.
+    session:    Shared HTTP session (client pushes, forwarded RSVPs); lives as
+                long as the app.
+    auth:       Authorization status of the persistent Context.
+    raw_events: Last seen RawEvent by uid, for conditional requests; guarded
+                by play_lock.
     """
 
     config: Config
     persist: PlayPersist
+    entries: dict[str, CacheEntry]
+    session: aiohttp.ClientSession
+    auth: AuthState = dataclasses.field(default_factory=AuthState)
+    raw_events: dict[str, TaggedRawEvent] = dataclasses.field(default_factory=dict)
     play_lock: asyncio.Lock = dataclasses.field(default_factory=asyncio.Lock)
     cache_lock: asyncio.Lock = dataclasses.field(default_factory=asyncio.Lock)